@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
+import mmap
 import struct
 import argparse
 from pathlib import Path
@@ -11,7 +12,14 @@ class MPKHeader:
     FIRST_ENTRY_OFFSET = 64
     FILENAME_LENGTH = 224  # 256 - 32 (header fields)
 
+# Precompiled structs: magic + version + file count, then one 256-byte file entry
+_HEADER_STRUCT = struct.Struct('<4sHHQ')
+_ENTRY_STRUCT = struct.Struct('<IIQQQ224s')  # size matches FILE_HEADER_LENGTH
+
 class MPKFile:
+    # No per-instance __dict__; archives can hold thousands of entries
+    __slots__ = ('filename', 'id', 'is_compressed', 'offset', 'size', 'actual_size')
+
     def __init__(self):
         self.filename = ""
         self.id = 0
@@ -26,51 +34,41 @@ class MPKExtractor:
         self.files = []
         self.version_major = 0
         self.version_minor = 0
-        self.mpk_data = None  # Store entire MPK file data
+        self.mpk_data = None  # Memory-mapped MPK file data
+        self._mpk_file = None  # Keep the file object alive for the mapping
 
     def load_mpk(self):
-        # Read entire MPK file into memory
-        with open(self.mpk_path, 'rb') as f:
-            self.mpk_data = f.read()
-            print(f"Loaded {len(self.mpk_data):,} bytes into memory")
+        # Memory-map the MPK file instead of reading it all into RAM;
+        # pages are faulted in on demand and never copied into user space
+        self._mpk_file = open(self.mpk_path, 'rb')
+        self.mpk_data = mmap.mmap(self._mpk_file.fileno(), 0, access=mmap.ACCESS_READ)
+        print(f"Memory-mapped {len(self.mpk_data):,} bytes")
 
     def read_header(self):
-        if not self.mpk_data:
+        if self.mpk_data is None:
             raise ValueError("MPK file not loaded. Call load_mpk() first.")
 
-        # Create a memoryview for efficient slicing
-        data = memoryview(self.mpk_data)
-        
-        # Read and verify magic number
-        if data[:4].tobytes() != MPKHeader.MPK_SIGNATURE:
+        # Read and verify magic number, version and file count in one unpack
+        magic, self.version_minor, self.version_major, file_count = \
+            _HEADER_STRUCT.unpack_from(self.mpk_data, 0)
+        if magic != MPKHeader.MPK_SIGNATURE:
             raise ValueError("Invalid MPK file format")
 
-        # Read version (4 bytes total)
-        self.version_minor = struct.unpack('<H', data[4:6].tobytes())[0]  # 2 bytes for minor
-        self.version_major = struct.unpack('<H', data[6:8].tobytes())[0]  # 2 bytes for major
-        
-        # Read file count
-        file_count = struct.unpack('<Q', data[8:16].tobytes())[0]  # 64-bit integer for count
-
-        # Read file entries
-        for i in range(file_count):
+        # Batch-decode all file entries with a single precompiled struct
+        entry_region = self.mpk_data[MPKHeader.FIRST_ENTRY_OFFSET:
+                                     MPKHeader.FIRST_ENTRY_OFFSET + file_count * MPKHeader.FILE_HEADER_LENGTH]
+        for is_compressed, file_id, offset, size, actual_size, filename_bytes \
+                in _ENTRY_STRUCT.iter_unpack(entry_region):
             mpk_file = MPKFile()
-            
-            # Calculate entry position
-            entry_pos = MPKHeader.FIRST_ENTRY_OFFSET + (i * MPKHeader.FILE_HEADER_LENGTH)
-            entry_data = data[entry_pos:entry_pos + MPKHeader.FILE_HEADER_LENGTH]
-            
-            # Read entry header
-            mpk_file.is_compressed = struct.unpack('<I', entry_data[0:4].tobytes())[0] == 1
-            mpk_file.id = struct.unpack('<I', entry_data[4:8].tobytes())[0]
-            mpk_file.offset = struct.unpack('<Q', entry_data[8:16].tobytes())[0]
-            mpk_file.size = struct.unpack('<Q', entry_data[16:24].tobytes())[0]
-            mpk_file.actual_size = struct.unpack('<Q', entry_data[24:32].tobytes())[0]
-            
-            # Read filename (224 bytes, null-terminated UTF-8)
-            filename_bytes = entry_data[32:32+MPKHeader.FILENAME_LENGTH].tobytes()
-            mpk_file.filename = filename_bytes.split(b'\0')[0].decode('utf-8').strip()
-            
+            mpk_file.is_compressed = is_compressed == 1
+            mpk_file.id = file_id
+            mpk_file.offset = offset
+            mpk_file.size = size
+            mpk_file.actual_size = actual_size
+
+            # Filename is 224 bytes, null-terminated UTF-8
+            mpk_file.filename = filename_bytes.partition(b'\0')[0].decode('utf-8').strip()
+
             self.files.append(mpk_file)
 
     def extract_files(self):
@@ -79,20 +77,58 @@ class MPKExtractor:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
+        # Track directories we already created to avoid a mkdir/stat per entry
+        created_dirs = {output_path}
+
         for mpk_file in self.files:
             print(f"  {mpk_file.filename} ({'compressed' if mpk_file.is_compressed else 'uncompressed'})")
-        
+
             file_path = output_path / mpk_file.filename
-            file_path.parent.mkdir(parents=True, exist_ok=True)
+            parent = file_path.parent
+            if parent not in created_dirs:
+                parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(parent)
 
             # TODO: Add decompression support if is_compressed is True
             if mpk_file.is_compressed:
                 print(f"Warning: Compressed file {mpk_file.filename} will be extracted as-is (decompression not implemented)")
 
-            # Get file data directly from mpk_data
-            file_data = self.mpk_data[mpk_file.offset:mpk_file.offset + mpk_file.size]
-            with open(file_path, 'wb') as out_file:
-                out_file.write(file_data)
+            # Write through a raw fd: the BufferedWriter wrapper buys nothing
+            # here since each entry is emitted as one kernel-side copy.
+            # O_BINARY keeps the Windows CRT from translating newlines
+            out_fd = os.open(file_path,
+                             os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0),
+                             0o644)
+            try:
+                self._copy_entry(out_fd, mpk_file.offset, mpk_file.size)
+            finally:
+                os.close(out_fd)
+
+    def _copy_entry(self, out_fd, offset, size):
+        # Prefer an in-kernel copy: no Python-level bytes object is ever
+        # materialized for the entry payload. Some platforms (e.g. macOS)
+        # expose os.sendfile but only accept a socket as the destination,
+        # raising OSError for regular files — fall back at runtime
+        remaining = size
+        if hasattr(os, 'sendfile'):
+            mpk_fd = self._mpk_file.fileno()
+            try:
+                while remaining > 0:
+                    sent = os.sendfile(out_fd, mpk_fd, offset, remaining)
+                    if sent == 0:
+                        raise ValueError(f"Unexpected end of MPK file at offset {offset}")
+                    offset += sent
+                    remaining -= sent
+                return
+            except OSError:
+                pass  # resume below from the current offset
+
+        # Fallback: write straight from the mapping without an
+        # intermediate bytes copy
+        view = memoryview(self.mpk_data)[offset:offset + remaining]
+        while view:
+            written = os.write(out_fd, view)
+            view = view[written:]
 
 def main():
     parser = argparse.ArgumentParser(description='Extract files from MPK archive')
@@ -7,6 +7,8 @@
 #
 
 import argparse
+import concurrent.futures
+import pickle
 import struct
 import os
 import sys
@@ -79,21 +81,51 @@ def print_banner():
     """
     print(banner)
 
+# Bytes stripped from font files before decoding. All ASCII, so deleting
+# them cannot split a multi-byte UTF-8 sequence. Note that the ideographic
+# space U+3000 must NOT be stripped: it is a real glyph slot (index 0 in the
+# bundled fonts) and removing it would shift every index.
+_FONT_STRIP = b'\r\n '
+
 def read_font_data(filename):
-    """Read font data from file and process it by removing newlines and spaces."""
-    with open(filename, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    # Remove carriage returns, newlines, and spaces
-    content = content.replace('\r', '').replace('\n', '')
-    
-    # Remove all spaces (regular and ideographic spaces)
-    content = content.replace(' ', '')
-    
-    # Check for and remove BOM (U+FEFF) at the beginning of the file
-    if content and content[0] == '\ufeff':
-        content = content[1:]
-    
+    """Read font data from file and process it by removing newlines and spaces.
+
+    The cleaned-up result is cached in a sibling '<filename>.cache' pickle
+    keyed on the source file's (mtime, size), so repeated runs skip the
+    scrubbing passes entirely.
+    """
+    stat = os.stat(filename)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cache_path = filename + '.cache'
+
+    # Try the cache first; fall through to a full parse on any mismatch
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached_signature, content = pickle.load(cache_file)
+        if cached_signature == signature:
+            return content
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        pass
+
+    # buffering=0 skips the BufferedReader copy for a whole-file read
+    with open(filename, 'rb', buffering=0) as file:
+        data = file.read()
+
+    # Check for and remove the UTF-8 BOM at the beginning of the file
+    if data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+
+    # Remove carriage returns, newlines, and regular spaces at the byte
+    # level, then decode the remaining text once
+    content = data.translate(None, _FONT_STRIP).decode('utf-8')
+
+    # Cache the scrubbed result; failing to write is not an error
+    try:
+        with open(cache_path, 'wb') as cache_file:
+            pickle.dump((signature, content), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+
     return content
 
 def read_player_name(filename="name.txt"):
@@ -140,6 +172,11 @@ def hex_to_char(index, font_data):
     except ValueError:
         return ("Error: Invalid hexadecimal input", False)
 
+# Precompiled structs: MSB header (magic, version, count, text offset) and
+# one entry-table record (index, offset)
+_MSB_HEADER_STRUCT = struct.Struct('<4siii')
+_MSB_ENTRY_STRUCT = struct.Struct('<ii')
+
 class MsbParser:
     """Parser for MSB files from Mages engine."""
     
@@ -160,8 +197,8 @@ class MsbParser:
         0x12: "SetMarginLeft",
         0x18: "InputOrSelect",
         0x19: "AutoForward",
-        0x20: "PlayerSurname",
-        0x21: "PlayerGivenName",
+        # 0x20/0x21 (player surname/given name) are spliced inline by
+        # parse_text_data and never reach the generic command path
         0x35: "SlowText",
         0xFF: "StringEnd"
     }
@@ -171,13 +208,16 @@ class MsbParser:
     def __init__(self, filename, font_data, name_file="name.txt", is_32bit=False):
         self.filename = filename
         self.font_data = font_data
+        # Precompute a tuple of interned 1-char strings for direct per-glyph
+        # indexing; repeated lookups then return the same object instead of
+        # allocating a fresh str per access
+        self.font_table = tuple(map(sys.intern, font_data))
         self.raw_data = None
         self.magic = None
         self.version = None
         self.count = None
         self.text_offset = None
         self.strings = []
-        self.current_string = ""
         self.entries = []  # List of (index, offset) tuples
         # Read player name
         self.player_surname, self.player_given_name = read_player_name(name_file)
@@ -186,23 +226,17 @@ class MsbParser:
 
     def read_header(self):
         """Read and verify MSB header structure."""
-        # Read and verify magic
-        self.magic = self.raw_data[:4]
+        # Read and verify magic, version, count and text offset in one unpack
+        self.magic, self.version, self.count, self.text_offset = \
+            _MSB_HEADER_STRUCT.unpack_from(self.raw_data, 0)
         if self.magic != self.MSB_SIGNATURE:
             raise ValueError(f"Invalid MSB file: Expected magic {self.MSB_SIGNATURE!r}, got {self.magic!r}")
 
-        # Read version and count
-        self.version = struct.unpack('<i', self.raw_data[4:8])[0]
-        self.count = struct.unpack('<i', self.raw_data[8:12])[0]
-        self.text_offset = struct.unpack('<i', self.raw_data[12:16])[0]
-
-        # Read entry table
+        # Read entry table (each entry is 8 bytes: 2 * int32)
         entry_start = 16  # After main header
-        for i in range(self.count):
-            pos = entry_start + (i * 8)  # Each entry is 8 bytes (2 * int32)
-            index, offset = struct.unpack('<ii', self.raw_data[pos:pos + 8])
-            self.entries.append((index, offset))
-            
+        entry_region = self.raw_data[entry_start:entry_start + self.count * 8]
+        self.entries = list(_MSB_ENTRY_STRUCT.iter_unpack(entry_region))
+
         print(f"File: {self.filename}")
         print(f"Magic: {self.magic!r}")
         print(f"Version: {self.version}")
@@ -212,9 +246,12 @@ class MsbParser:
     def parse(self):
         """Parse the MSB file."""
         try:
-            with open(self.filename, 'rb') as file:
-                self.raw_data = file.read()
-                
+            # Skip the read when the caller preloaded raw_data (see main)
+            if self.raw_data is None:
+                # buffering=0 skips the BufferedReader copy for a whole-file read
+                with open(self.filename, 'rb', buffering=0) as file:
+                    self.raw_data = file.read()
+
             # Parse header structure
             self.read_header()
             
@@ -229,85 +266,84 @@ class MsbParser:
     
     def parse_text_data(self):
         """Parse the text data using the entries table."""
+        # 16-bit mode (FTV1/FTV2) reads 2 bytes per glyph, 32-bit (FTCM) reads 4;
+        # hoist the width and high-bit mask out of the per-byte loop
+        char_width = 4 if self.is_32bit else 2
+        char_mask = 0x7FFFFFFF if self.is_32bit else 0x7FFF
+
+        # Slicing a memoryview is O(1) and never copies the underlying bytes
+        raw = memoryview(self.raw_data)
+        data_len = len(raw)
+        text_offset = self.text_offset
+        # Last position a whole glyph can start at; checked with a single
+        # compare per glyph instead of recomputing i + char_width
+        last_glyph_start = data_len - char_width
+
         for entry_idx, (index, offset) in enumerate(self.entries):
-            # Reset current string for each entry
-            current_string = ""
-            
+            # Collect string parts and join once at the end of the entry
+            parts = []
+
             # Calculate the length of text to read
-            i = self.text_offset + offset
-            
-            while i < len(self.raw_data):
+            i = text_offset + offset
+
+            while i < data_len:
                 # Get the current byte
-                current_byte = self.raw_data[i]
+                current_byte = raw[i]
                 
                 # Check if it's a character (high bit set)
                 if current_byte >= 0x80 and current_byte < 0xFF:
-                    # Handle differently based on character encoding
-                    if not self.is_32bit:
-                        # 16-bit mode (FTV1/FTV2): Read 2 bytes
-                        if i + 1 < len(self.raw_data):
-                            # Unpack 2 bytes as big-endian unsigned short (16-bit)
-                            char_code = struct.unpack('>H', self.raw_data[i:i+2])[0]
-                            
-                            # Clear highest bit for 16-bit
-                            char_code &= 0x7FFF
-                            
-                            # Move forward 2 bytes
-                            i += 2
-                    else:
-                        # 32-bit mode (FTCM): Read 4 bytes
-                        if i + 3 < len(self.raw_data):
-                            # Unpack 4 bytes as big-endian unsigned int (32-bit)
-                            char_code = struct.unpack('>I', self.raw_data[i:i+4])[0]
-                            
-                            # Clear highest bit for 32-bit
-                            char_code &= 0x7FFFFFFF
-
-                            # Move forward 4 bytes
-                            i += 4
-                    
-                    # Convert to character using font data
-                    char, success = hex_to_char(char_code, self.font_data)
-                    if success:
-                        current_string += char
+                    if i > last_glyph_start:
+                        # Truncated glyph at the end of the data
+                        break
+
+                    # Read the big-endian char code and clear the highest bit
+                    char_code = int.from_bytes(raw[i:i+char_width], 'big') & char_mask
+                    i += char_width
+
+                    # Convert to character with a direct font table lookup
+                    if char_code == 0x3F:
+                        # For English version, 0x3F is a space character
+                        parts.append(" ")
                     else:
-                        # If character conversion failed, add the hex code and show more context
-                        print(f"Failed to convert character at entry {entry_idx}, offset {offset + i}: {char_code:08X}")
-                        print(f"Following 10 bytes: {' '.join([f'{b:02X}' for b in self.raw_data[i:i+10]])}")
-                        current_string += f"[{char_code:08X}]"
+                        try:
+                            parts.append(self.font_table[char_code])
+                        except IndexError:
+                            # If character conversion failed, add the hex code and show more context
+                            print(f"Failed to convert character at entry {entry_idx}, offset {offset + i}: {char_code:08X}")
+                            print(f"Following 10 bytes: {' '.join([f'{b:02X}' for b in raw[i:i+10]])}")
+                            parts.append(f"[{char_code:08X}]")
                 else:
                     # It's a command byte
                     if current_byte == 0xFF:
                         # End of string marker, break the loop
                         break
-                    elif current_byte == 0x04 and i + 3 < len(self.raw_data):
+                    elif current_byte == 0x04 and i + 3 < data_len:
                         # Handle SetColor command with RGB values
-                        r, g, b = self.raw_data[i+1:i+4]
-                        current_string += f"<#{r:02X}{g:02X}{b:02X}>"
+                        r, g, b = raw[i+1], raw[i+2], raw[i+3]
+                        parts.append(f"<#{r:02X}{g:02X}{b:02X}>")
                         i += 4  # Skip command byte and 3 RGB bytes
-                    elif current_byte == 0x12 and i + 2 < len(self.raw_data):
+                    elif current_byte == 0x12 and i + 2 < data_len:
                         # Handle SetMarginLeft command with RGB values
-                        margin_left = struct.unpack('>H', self.raw_data[i+1:i+3])[0]
-                        current_string += f"<MarginLeft:{margin_left}>"
+                        margin_left = int.from_bytes(raw[i+1:i+3], 'big')
+                        parts.append(f"<MarginLeft:{margin_left}>")
                         i += 3  # Skip command byte and 2 RGB bytes
                     elif current_byte == 0x20:
                         # Player surname
-                        current_string += self.player_surname
+                        parts.append(self.player_surname)
                         i += 1
                     elif current_byte == 0x21:
                         # Player given name
-                        current_string += self.player_given_name
+                        parts.append(self.player_given_name)
                         i += 1
                     else:
-                        # Regular command
-                        cmd_name = self.COMMAND_CODES.get(current_byte, f"Cmd{current_byte:02X}")
-                        current_string += f"[{cmd_name}]"
+                        # Regular command, rendered via the precomputed table
+                        parts.append(self._CMD_STRINGS[current_byte])
                         i += 1
             
             # Add the entry's string if there is one
-            if current_string:
+            if parts:
                 # Add entry index to the string for better tracking
-                self.strings.append(f"[{index}] {current_string}")
+                self.strings.append(f"[{index}] {''.join(parts)}")
     
     def save_txt(self, output_file=None):
         """Save decoded strings to a text file."""
@@ -315,20 +351,28 @@ class MsbParser:
             output_file = os.path.splitext(self.filename)[0] + ".txt"
             
         try:
-            with open(output_file, 'w', encoding='utf-8') as file:
-                file.write(f"# Extracted by msb2txt\n")
-                file.write(f"# Copyright (c) 2025 Tommy Lau\n")
-                file.write(f"# Player name: {self.player_surname} {self.player_given_name}\n\n")
-                
-                for s in self.strings:
-                    file.write(f"{s}\n")
-                    
+            # Join header and body up front and emit a single write
+            header = (f"# Extracted by msb2txt\n"
+                      f"# Copyright (c) 2025 Tommy Lau\n"
+                      f"# Player name: {self.player_surname} {self.player_given_name}\n\n")
+            body = '\n'.join(self.strings) + '\n' if self.strings else ''
+            with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as file:
+                file.write(header + body)
+
             print(f"Decoded text saved to {output_file}")
             return True
         except Exception as e:
             print(f"Error saving text file: {e}")
             return False
 
+# Rendered command strings for every byte value, indexed directly in the
+# decode loop; known commands render as "[Name]", unknown ones as "[CmdXX]".
+# Built once at import (outside the class body so the generator expression
+# can see COMMAND_CODES).
+MsbParser._CMD_STRINGS = tuple(
+    f"[{MsbParser.COMMAND_CODES.get(i, f'Cmd{i:02X}')}]" for i in range(256)
+)
+
 def main():
     # Print banner if no arguments provided
     if len(sys.argv) == 1:
@@ -380,15 +424,22 @@ Copyright (c) 2025 Tommy Lau <tommy.lhg@gmail.com>
             # Use appropriate default font based on mode
             font_name = 'font_gl.txt' if args.ftcm else 'font_ftv1_2.txt'
             
-        # Find and read font data
+        # Find the font, then overlap its load/scrub with reading the MSB
+        # payload in this thread; both mostly block in GIL-releasing I/O so
+        # wall time is the max of the two rather than the sum
         font_path = find_font_file(font_name)
-        font_data = read_font_data(font_path)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            font_future = executor.submit(read_font_data, font_path)
+            with open(args.input_file, 'rb', buffering=0) as msb_file:
+                raw_data = msb_file.read()
+            font_data = font_future.result()
         print(f"Font data loaded from {font_path}")
         print(f"Font data loaded with {len(font_data)} characters.")
         print(f"Game: {'FTCM (32-bit)' if args.ftcm else 'FTV1/FTV2 (16-bit)'}")
-        
+
         # Parse MSB file
         parser = MsbParser(args.input_file, font_data, args.name, is_32bit=args.ftcm)
+        parser.raw_data = raw_data
         if parser.parse():
             parser.save_txt(args.output)
             